@@ -1,21 +1,122 @@
+import asyncio
+import hashlib
+import io
+import logging
 import os
+import struct
 import subprocess
 import tempfile
+from collections import OrderedDict
+from collections.abc import AsyncIterator
 from contextlib import asynccontextmanager
 from typing import Literal, Optional
 
 from fastapi import FastAPI, File, Form, UploadFile
-from fastapi.responses import PlainTextResponse, Response
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
+from mlx_audio.audio_io import read as read_audio
+from mlx_audio.stt.utils import resample_audio
+import numpy as np
 from pydantic import BaseModel
+import soundfile as sf
 
-from models import stt_model_manager, tts_model_manager
+from models import SAMPLE_RATE, mlx_executor, stt_model_manager, tts_model_manager, wav_header
+
+logger = logging.getLogger(__name__)
 
 
 @asynccontextmanager
 async def lifespan(_app: FastAPI):
+    # Load both models up front so the first request doesn't pay for it
+    await stt_model_manager.load()
+    await tts_model_manager.load()
     yield
-    stt_model_manager.shutdown()
-    tts_model_manager.shutdown()
+    await stt_model_manager.shutdown()
+    await tts_model_manager.shutdown()
+    mlx_executor.shutdown()
+
+
+UPLOAD_CHUNK_SIZE = 1 << 20  # 1 MiB
+
+SPEECH_MEDIA_TYPES = {
+    "wav": "audio/wav",
+    "mp3": "audio/mpeg",
+    "flac": "audio/flac",
+    "opus": "audio/ogg",
+}
+# libsndfile (format, subtype) for the compressed response formats
+SPEECH_ENCODINGS = {
+    "mp3": ("MP3", "MPEG_LAYER_III"),
+    "flac": ("FLAC", "PCM_16"),
+    "opus": ("OGG", "OPUS"),
+}
+
+
+class ResultCache:
+    """LRU of recent results, bounded by the total size of the stored values."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict = OrderedDict()
+        self._size = 0
+
+    def get(self, key):
+        value = self._entries.get(key)
+        if value is not None:
+            self._entries.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        if len(value) > self.max_bytes:
+            return
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._size -= len(old)
+        self._entries[key] = value
+        self._size += len(value)
+        while self._size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._size -= len(evicted)
+
+
+# Upload SHA-256 -> transcript, (text, language, format) -> audio
+transcription_cache = ResultCache(max_bytes=1 << 20)  # 1 MiB
+speech_cache = ResultCache(max_bytes=64 << 20)  # 64 MiB
+
+
+def load_waveform(path: str) -> np.ndarray:
+    """Read an audio file as a 16 kHz mono float32 waveform.
+
+    Plain NumPy, so decoding never needs the MLX thread; Whisper converts the
+    array itself when it runs.
+    """
+    audio, sample_rate = read_audio(path, always_2d=True)
+    if sample_rate != SAMPLE_RATE:
+        audio = resample_audio(audio, sample_rate, SAMPLE_RATE)
+    return audio.mean(axis=1).astype(np.float32)
+
+
+def decode_audio(path: str) -> np.ndarray:
+    """Decode an audio file to a 16 kHz mono waveform.
+
+    WAV, MP3, FLAC and Vorbis are decoded and resampled in-process; anything
+    else (e.g. webm from browsers) falls back to an ffmpeg transcode.
+    """
+    try:
+        return load_waveform(path)
+    except Exception:
+        logger.debug("In-process decode of %s failed; falling back to ffmpeg", path, exc_info=True)
+
+    wav_path = path + ".wav"
+    try:
+        subprocess.run(
+            ["ffmpeg", "-i", path, "-ar", "16000", "-ac", "1", "-y", wav_path],
+            check=True,
+            capture_output=True,
+        )
+        return load_waveform(wav_path)
+    finally:
+        if os.path.exists(wav_path):
+            os.unlink(wav_path)
 
 
 app = FastAPI(title="Audio API", description="OpenAI-compatible Audio API (STT & TTS)", lifespan=lifespan)
@@ -38,25 +139,27 @@ async def create_transcription(
     Transcribes audio into the input language.
     Compatible with OpenAI's /v1/audio/transcriptions endpoint.
     """
-    # Save uploaded file to a temporary location
+    # Stream the upload to disk so it is never held in memory whole
+    digest = hashlib.sha256()
     with tempfile.NamedTemporaryFile(delete=False, suffix=file.filename) as tmp:
-        content = await file.read()
-        tmp.write(content)
+        while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+            digest.update(chunk)
+            tmp.write(chunk)
         tmp_path = tmp.name
 
-    # Convert to WAV format for consistent processing
-    wav_path = tmp_path + ".wav"
-    try:
-        subprocess.run(
-            ["ffmpeg", "-i", tmp_path, "-ar", "16000", "-ac", "1", "-y", wav_path],
-            check=True,
-            capture_output=True,
-        )
-        text = stt_model_manager.transcribe(wav_path)
-    finally:
+    key = digest.hexdigest()
+    text = transcription_cache.get(key)
+    if text is None:
+        try:
+            # Decoding (possibly an ffmpeg transcode) runs in a worker thread,
+            # not on the MLX thread, so it doesn't stall queued inference
+            audio = await asyncio.to_thread(decode_audio, tmp_path)
+        finally:
+            os.unlink(tmp_path)
+        text = await stt_model_manager.transcribe(audio)
+        transcription_cache.put(key, text)
+    else:
         os.unlink(tmp_path)
-        if os.path.exists(wav_path):
-            os.unlink(wav_path)
 
     if response_format == "text":
         return PlainTextResponse(content=text)
@@ -79,8 +182,53 @@ async def create_speech(request: SpeechRequest):
     Generates audio from the input text.
     Compatible with OpenAI's /v1/audio/speech endpoint.
     """
-    audio_bytes = tts_model_manager.generate_speech(request.input, lang_code=request.language)
-    return Response(content=audio_bytes, media_type="audio/wav")
+    media_type = SPEECH_MEDIA_TYPES[request.response_format]
+    key = (request.input, request.language, request.response_format)
+    cached = speech_cache.get(key)
+    if cached is not None:
+        return Response(content=cached, media_type=media_type)
+
+    audio = tts_model_manager.generate_speech(request.input, lang_code=request.language)
+    if request.response_format == "wav":
+        return StreamingResponse(cache_speech(key, audio), media_type=media_type)
+
+    content = await compress_speech(audio, request.response_format)
+    speech_cache.put(key, content)
+    return Response(content=content, media_type=media_type)
+
+
+async def compress_speech(chunks: AsyncIterator[bytes], response_format: str) -> bytes:
+    """Encode a generated WAV stream to a compressed format."""
+    header = await anext(chunks)
+    sample_rate = struct.unpack_from("<I", header, 24)[0]
+    pcm = np.frombuffer(b"".join([chunk async for chunk in chunks]), dtype=np.int16)
+
+    # The whole utterance is in hand here, so normalize its peak to 0.95 as
+    # the non-streaming path always did
+    peak = int(np.abs(pcm, dtype=np.int32).max(initial=0))
+    if peak:
+        pcm = (pcm * (0.95 * 32767 / peak)).astype(np.int16)
+
+    container, subtype = SPEECH_ENCODINGS[response_format]
+    buffer = io.BytesIO()
+    await asyncio.to_thread(
+        sf.write, buffer, pcm, samplerate=sample_rate, format=container, subtype=subtype
+    )
+    return buffer.getvalue()
+
+
+async def cache_speech(key: tuple[str, str, str], chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """Pass generated audio through, caching it once the utterance is complete."""
+    parts = []
+    async for chunk in chunks:
+        parts.append(chunk)
+        yield chunk
+
+    # The streamed header has placeholder sizes; the cached copy gets real ones
+    header, *pcm = parts
+    data = b"".join(pcm)
+    sample_rate = struct.unpack_from("<I", header, 24)[0]
+    speech_cache.put(key, wav_header(sample_rate, len(data)) + data)
 
 
 if __name__ == "__main__":
@@ -1,111 +1,237 @@
 import asyncio
-import io
+import functools
+import gc
+import logging
+import struct
 import time
 from abc import ABC, abstractmethod
+from collections.abc import AsyncIterator
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
 
 import mlx.core as mx
-import soundfile as sf
+import mlx.nn as nn
+import numpy as np
 from mlx_audio.stt.utils import load_model as load_stt_model
 from mlx_audio.tts.utils import load_model as load_tts_model
 
+logger = logging.getLogger(__name__)
+
 UNLOAD_TIMEOUT_SECONDS = 60 * 60  # 60 minutes
-CHECK_INTERVAL_SECONDS = 60  # Check every minute
+CHECK_INTERVAL_SECONDS = 60  # Shortest sleep between checks
+SAMPLE_RATE = 16000  # Whisper input rate
+
+
+WAV_HEADER_SIZE = 44
+WAV_UNKNOWN_SIZE = 0xFFFFFFFF
+
+
+def wav_header(sample_rate: int, data_size: int | None = None) -> bytes:
+    """Header for 16-bit mono WAV.
+
+    Without ``data_size`` the RIFF and data sizes are set to 0xFFFFFFFF, as for
+    a stream of unknown length; readers relying on them (e.g. ``wave``) must
+    then derive the length from the payload. Pass the real size whenever the
+    whole utterance is known.
+    """
+    if data_size is None:
+        riff_size = data_size = WAV_UNKNOWN_SIZE
+    else:
+        riff_size = WAV_HEADER_SIZE - 8 + data_size
+    return struct.pack(
+        "<4sI4s4sIHHIIHH4sI",
+        b"RIFF", riff_size, b"WAVE",
+        b"fmt ", 16, 1, 1, sample_rate, sample_rate * 2, 2, 16,
+        b"data", data_size,
+    )
+
+
+# All MLX work (loads, inference, host copies, unloads) for both models runs
+# on this one thread. The models and the Metal device must not be driven from
+# several threads at once, and a streamed utterance stays on one thread.
+mlx_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="mlx")
+
+
+async def run_mlx(func, *args, **kwargs):
+    """Run a blocking MLX call on the MLX thread."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(mlx_executor, functools.partial(func, *args, **kwargs))
+
+
+def free_mlx_memory():
+    """Return MLX's cached buffers once a model has been dropped."""
+    # Collect any reference cycles still holding weights so clear_cache
+    # can actually return their buffers
+    gc.collect()
+    mx.synchronize()
+    mx.clear_cache()
+
+
+def next_pcm(chunks) -> mx.array | None:
+    """Advance a TTS generator to its next non-empty chunk and queue it as int16."""
+    for result in chunks:
+        if result.audio.size == 0:
+            continue
+        # The utterance's peak isn't known while streaming, and a gain that
+        # adapts per chunk makes the level jump between chunks, so only clip.
+        # Quantize on-device; only int16 crosses to the host.
+        pcm = (mx.clip(result.audio, -1.0, 1.0) * 32767).astype(mx.int16)
+        mx.async_eval(pcm)
+        return pcm
+    return None
+
+
+def pcm_bytes(pcm: mx.array) -> bytes:
+    """Wait for an int16 chunk and copy it to the host."""
+    return np.asarray(pcm).tobytes()
 
 
 class ModelManager(ABC):
-    def __init__(self):
+    def __init__(self, warm_up: bool = True):
+        self.warm_up = warm_up
         self._model = None
         self._last_used: float = 0
         self._checker_task: asyncio.Task | None = None
         self._shutdown = False
+        self._in_use = 0
+        self._load_lock = asyncio.Lock()
 
     @abstractmethod
     def _load_model(self):
         """Load and return the model. Implemented by subclasses."""
 
-    def _get_model(self):
+    def _warm_up(self, model):
+        """Run a tiny input through a freshly loaded model. Overridden by subclasses."""
+
+    def _load_warm_model(self):
+        """Load the model and, unless disabled, compile its kernels with a warmup pass."""
+        model = self._load_model()
+        if self.warm_up:
+            try:
+                self._warm_up(model)
+            except Exception:
+                # Only costs the first request its kernel compile; keep the model
+                logger.warning("Warm-up of %s failed", type(self).__name__, exc_info=True)
+        return model
+
+    async def _get_model(self):
         """Get the model, loading it if necessary and updating last used time."""
-        if self._model is None:
-            self._model = self._load_model()
-            if self._checker_task is None:
-                self._checker_task = asyncio.create_task(self._check_inactivity())
+        async with self._load_lock:
+            if self._model is None:
+                # Load on the MLX thread; the lock makes concurrent first
+                # requests wait for this load instead of starting their own.
+                self._model = await run_mlx(self._load_warm_model)
+                if self._checker_task is None:
+                    self._checker_task = asyncio.create_task(self._check_inactivity())
 
         self._last_used = time.monotonic()
         return self._model
 
-    def _unload_model(self):
+    async def load(self):
+        """Load the model ahead of the first request."""
+        await self._get_model()
+
+    @asynccontextmanager
+    async def _use_model(self):
+        """Get the model and pin it against idle unloading while in use."""
+        model = await self._get_model()
+        self._in_use += 1
+        try:
+            yield model
+        finally:
+            self._in_use -= 1
+            self._last_used = time.monotonic()
+
+    async def _unload_model(self):
         """Release the model and free MLX memory."""
         if self._model is not None:
-            del self._model
+            # Drop it here so no new request picks it up, then free the memory
+            # on the MLX thread once any queued work on it has finished
             self._model = None
-            mx.synchronize()
-            mx.clear_cache()
+            await run_mlx(free_mlx_memory)
 
     async def _check_inactivity(self):
-        """Periodically check for inactivity and unload model if idle too long."""
+        """Sleep until the idle deadline, then unload the model if it is still idle."""
         while not self._shutdown:
-            await asyncio.sleep(CHECK_INTERVAL_SECONDS)
-            if self._model is not None:
+            # Use in the meantime pushes the deadline out; sleep again until the new one
+            delay = self._last_used + UNLOAD_TIMEOUT_SECONDS - time.monotonic()
+            await asyncio.sleep(max(delay, CHECK_INTERVAL_SECONDS))
+            if self._model is not None and not self._in_use:
                 idle_time = time.monotonic() - self._last_used
                 if idle_time >= UNLOAD_TIMEOUT_SECONDS:
-                    self._unload_model()
                     self._checker_task = None
+                    await self._unload_model()
                     return
 
-    def shutdown(self):
+    async def shutdown(self):
         self._shutdown = True
         if self._checker_task is not None:
             self._checker_task.cancel()
-        self._unload_model()
+        await self._unload_model()
 
 
 class STTModelManager(ModelManager):
-    def __init__(self):
-        super().__init__()
+    def __init__(self, warm_up: bool = True):
+        super().__init__(warm_up)
         self.model_name = "mlx-community/whisper-large-v3-turbo-asr-fp16"
+        self.quantize_bits = 4
+        self.quantize_group_size = 64
 
     def _load_model(self):
-        return load_stt_model(self.model_name)
-
-    def transcribe(self, audio_path: str) -> str:
-        """Transcribe audio file to text."""
-        return self._get_model().generate(audio=audio_path).text
+        model = load_stt_model(self.model_name)
+        # 4-bit linear layers cut the encoder's matmul cost at a small WER
+        # cost; the token embedding doubles as the output head and stays fp16.
+        nn.quantize(
+            model,
+            group_size=self.quantize_group_size,
+            bits=self.quantize_bits,
+            class_predicate=lambda _, module: isinstance(module, nn.Linear),
+        )
+        mx.eval(model.parameters())
+        return model
+
+    def _warm_up(self, model):
+        # One second of silence runs mel, encoder and decoder kernels once
+        model.generate(audio=mx.zeros(SAMPLE_RATE), language="en", temperature=0.0)
+
+    async def transcribe(self, audio: str | np.ndarray | mx.array) -> str:
+        """Transcribe an audio file or 16 kHz mono waveform to text."""
+        async with self._use_model() as model:
+            result = await run_mlx(model.generate, audio=audio)
+            return result.text
 
 
 class TTSModelManager(ModelManager):
-    def __init__(self):
-        super().__init__()
+    def __init__(self, warm_up: bool = True):
+        super().__init__(warm_up)
         self.model_name = "mlx-community/Voxtral-4B-TTS-2603-mlx-bf16"
+        self.default_voice = "casual_male"
+        self.voices = {"de": "de_male"}  # language code -> voice
 
     def _load_model(self):
-        return load_tts_model(self.model_name)
-
-    def generate_speech(self, text: str, lang_code: str = "en") -> bytes:
-        """Generate speech audio from text. Returns WAV bytes."""
-        model = self._get_model()
-
-        voice = "casual_male"
-        if lang_code == "de":
-            voice = "de_male"
-
-        audio_chunks = []
-        for result in model.generate(text, voice=voice):
-            audio_chunks.append(result.audio)
-
-        if not audio_chunks:
-            return b""
-
-        audio = mx.concatenate(audio_chunks, axis=0)
-
-        peak = float(mx.max(mx.abs(audio)).item())
-        if peak > 1e-8:
-            audio = mx.clip(audio * (0.95 / peak), -1.0, 1.0)
-
-        buffer = io.BytesIO()
-        sf.write(buffer, audio, samplerate=model.sample_rate, format="WAV")
-        buffer.seek(0)
-
-        return buffer.read()
+        model = load_tts_model(self.model_name)
+        # Voxtral reads each voice embedding from disk on first use; only a
+        # fixed couple of voices are ever used, so load them with the model.
+        # A missing voice comes back as None; it only affects its own language.
+        voices = {self.default_voice, *self.voices.values()}
+        embeddings = [model._get_voice_embedding(voice) for voice in voices]
+        mx.eval([embedding for embedding in embeddings if embedding is not None])
+        return model
+
+    def _warm_up(self, model):
+        for _ in model.generate("a", voice=self.default_voice):
+            pass
+
+    async def generate_speech(self, text: str, lang_code: str = "en") -> AsyncIterator[bytes]:
+        """Generate speech audio from text. Yields a streaming WAV, chunk by chunk."""
+        async with self._use_model() as model:
+            voice = self.voices.get(lang_code, self.default_voice)
+
+            yield wav_header(model.sample_rate)
+
+            chunks = model.generate(text, voice=voice, stream=True)
+            while (pcm := await run_mlx(next_pcm, chunks)) is not None:
+                yield await run_mlx(pcm_bytes, pcm)
 
 
 stt_model_manager = STTModelManager()
@@ -6,6 +6,9 @@ import requests
 
 BASE_URL = "http://localhost:9100"
 
+# Reuses the keep-alive connection across calls
+SESSION = requests.Session()
+
 
 def transcribe_audio(audio_path: Path) -> str:
     """Send audio file to transcription endpoint and return the text."""
@@ -14,7 +17,7 @@ def transcribe_audio(audio_path: Path) -> str:
     with open(audio_path, "rb") as f:
         files = {"file": (audio_path.name, f, "audio/wav")}
         data = {"model": "whisper-1", "response_format": "json"}
-        response = requests.post(url, files=files, data=data)
+        response = SESSION.post(url, files=files, data=data)
 
     response.raise_for_status()
     return response.json()["text"]
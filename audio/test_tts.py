@@ -6,6 +6,9 @@ import requests
 
 BASE_URL = "http://localhost:9100"
 
+# Reuses the keep-alive connection across calls
+SESSION = requests.Session()
+
 
 def text_to_speech(text: str, output_path: Path, language: str = "en") -> None:
     """Send text to TTS endpoint and save the audio output."""
@@ -17,11 +20,12 @@ def text_to_speech(text: str, output_path: Path, language: str = "en") -> None:
         "language": language,
         "speed": 1.0,
     }
-    response = requests.post(url, json=payload)
-    response.raise_for_status()
-
-    with open(output_path, "wb") as f:
-        f.write(response.content)
+    # The server streams audio as it is generated; write it out the same way
+    with SESSION.post(url, json=payload, stream=True) as response:
+        response.raise_for_status()
+        with open(output_path, "wb") as f:
+            for chunk in response.iter_content(chunk_size=64 * 1024):
+                f.write(chunk)
 
 
 def main():
@@ -1,7 +1,14 @@
+import asyncio
 import base64
+import functools
+import itertools
+import json
 import logging
-import uuid
-from typing import Any, Dict, Union
+import secrets
+import struct
+import time
+from operator import itemgetter
+from typing import Any, Dict, List, Optional, Union
 
 import aiohttp
 
@@ -9,6 +16,20 @@ from mikoshi.tools.toolset_handler import ToolSetHandler, tool
 
 logger = logging.getLogger(__name__)
 
+_card_fields = itemgetter("Front", "Back")
+# Compact JSON for request bodies; storeMediaFile payloads carry whole WAVs.
+_dumps = functools.partial(json.dumps, separators=(",", ":"), ensure_ascii=False)
+# Held back from the base64 stream so the WAV sizes can be patched in at the
+# end: the 44-byte header plus one byte, to keep it a multiple of 3.
+_WAV_HEAD_SIZE = 45
+_WAV_HEAD_B64_SIZE = _WAV_HEAD_SIZE // 3 * 4
+
+
+@functools.lru_cache(maxsize=None)
+def _envelope_prefix(action: str, version: int) -> str:
+    """Serialized AnkiConnect envelope up to the params value."""
+    return _dumps({"action": action, "version": version})[:-1] + ',"params":'
+
 
 class AnkiTool(ToolSetHandler):
     server_name = "anki"
@@ -16,46 +37,150 @@ class AnkiTool(ToolSetHandler):
     ANKI_CONNECT_URL = "http://localhost:8765"
     AUDIO_SERVICE_URL = "http://localhost:9100"
     ANKI_CONNECT_VERSION = 6
+    READ_ACTIONS = frozenset({"findNotes", "notesInfo", "deckNames"})
+    READ_CACHE_TTL = 5.0  # seconds; absorbs repeated reads within one agent turn
+    ADD_CARDS_CONCURRENCY = 8
+    SYNC_DELAY = 5.0  # seconds to wait for more cards before syncing to AnkiWeb
+    AUDIO_CHUNK_SIZE = 3 * 8192  # multiple of 3 so chunks encode without padding
     DECK_NAME = "German::Sentences"
 
+    # Media filename ids: a random per-process prefix plus a counter keeps
+    # names unique across restarts without hitting urandom for every card.
+    _RUN_ID = secrets.token_hex(4)
+    _CARD_COUNTER = itertools.count()
+
     def __init__(self):
         super().__init__()
+        self._session: Optional[aiohttp.ClientSession] = None
+        # createDeck is idempotent; only send it until it has succeeded once.
+        self._deck_ready = False
+        self._read_cache: Dict[tuple, tuple] = {}
+        self._sync_task: Optional[asyncio.Task] = None
+        self._sync_requested = False
 
-    async def _anki_request(self, action: str, params: Dict = None) -> Any:
-        payload = {
-            "action": action,
-            "version": self.ANKI_CONNECT_VERSION,
-            "params": params or {}
-        }
-        async with aiohttp.ClientSession() as session:
-            async with session.post(self.ANKI_CONNECT_URL, json=payload) as resp:
-                data = await resp.json()
-                if data.get("error"):
-                    return f"AnkiConnect error: {data['error']}"
-                return data.get("result")
-
-    async def _generate_audio(self, text: str, language: str = "en") -> bytes:
+    async def initialize(self):
+        await super().initialize()
+        # One keep-alive pool for both AnkiConnect and the audio service;
+        # add_card hits them several times back-to-back.
+        self._session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=32, keepalive_timeout=60),
+            json_serialize=_dumps,
+        )
+
+    async def cleanup(self):
+        if self._sync_task and not self._sync_task.done():
+            # Flush the pending sync so freshly added cards reach AnkiWeb.
+            await self._sync_task
+        if self._session:
+            await self._session.close()
+            self._session = None
+
+    async def _anki_request(self, action: str, params: Dict = None, cache_ttl: float = 0) -> Any:
+        if not self._session:
+            return "AnkiConnect error: Anki client not initialized"
+        if cache_ttl > 0:
+            key = (action, json.dumps(params, sort_keys=True))
+            cached = self._read_cache.get(key)
+            if cached and time.monotonic() - cached[0] < cache_ttl:
+                return cached[1]
+        body = _envelope_prefix(action, self.ANKI_CONNECT_VERSION) + _dumps(params or {}) + "}"
+        async with self._session.post(
+            self.ANKI_CONNECT_URL,
+            data=body.encode(),
+            headers={"Content-Type": "application/json"},
+        ) as resp:
+            data = await resp.json()
+        if data.get("error"):
+            return f"AnkiConnect error: {data['error']}"
+        result = data.get("result")
+        if cache_ttl > 0:
+            self._read_cache[key] = (time.monotonic(), result)
+        elif action not in self.READ_ACTIONS:
+            self._read_cache.clear()
+        return result
+
+    async def _generate_audio(self, text: str, language: str = "en") -> str:
+        """Generate speech via TTS and return it base64-encoded.
+
+        The response is encoded chunk by chunk so the raw WAV never has to be
+        held in memory alongside its base64 form. The service streams WAV with
+        placeholder sizes; the header is held back and gets the real sizes
+        before encoding, since the file is kept in the collection for good.
+        """
         payload = {
             "model": "tts-1",
             "input": text,
             "voice": "alloy",
             "language": language
         }
-        async with aiohttp.ClientSession() as session:
-            async with session.post(
-                f"{self.AUDIO_SERVICE_URL}/v1/audio/speech",
-                json=payload
-            ) as resp:
-                resp.raise_for_status()
-                return await resp.read()
-
-    async def _store_audio(self, audio_data: bytes, filename: str) -> None:
-        audio_b64 = base64.b64encode(audio_data).decode("utf-8")
-        await self._anki_request("storeMediaFile", {
-            "filename": filename,
-            "data": audio_b64
+        if not self._session:
+            raise RuntimeError("Anki client not initialized")
+        async with self._session.post(
+            f"{self.AUDIO_SERVICE_URL}/v1/audio/speech",
+            json=payload
+        ) as resp:
+            resp.raise_for_status()
+            head = bytearray()
+            # Slot for the header's base64, filled in once the sizes are known
+            encoded = bytearray(_WAV_HEAD_B64_SIZE)
+            carry = b""
+            size = 0
+            async for chunk in resp.content.iter_chunked(self.AUDIO_CHUNK_SIZE):
+                size += len(chunk)
+                if len(head) < _WAV_HEAD_SIZE:
+                    take = _WAV_HEAD_SIZE - len(head)
+                    head += chunk[:take]
+                    chunk = chunk[take:]
+                    if not chunk:
+                        continue
+                chunk = carry + chunk
+                cut = len(chunk) - len(chunk) % 3
+                encoded += base64.b64encode(chunk[:cut])
+                carry = chunk[cut:]
+            encoded += base64.b64encode(carry)
+            if head[:4] == b"RIFF" and head[36:40] == b"data":
+                struct.pack_into("<I", head, 4, size - 8)
+                struct.pack_into("<I", head, 40, size - 44)
+            encoded[:_WAV_HEAD_B64_SIZE] = base64.b64encode(head)
+            return encoded.decode("ascii")
+
+    async def _anki_multi(self, actions: List[Dict]) -> Union[str, List[Dict]]:
+        """Run several AnkiConnect actions in one round trip.
+
+        Returns one ``{"result": ..., "error": ...}`` entry per action, in order.
+        """
+        return await self._anki_request("multi", {
+            "actions": [
+                {"version": self.ANKI_CONNECT_VERSION, **action} for action in actions
+            ]
         })
 
+    def _schedule_sync(self) -> None:
+        """Request an AnkiWeb sync in the background.
+
+        Requests arriving while a sync is pending are coalesced into it.
+        """
+        self._sync_requested = True
+        if self._sync_task is None or self._sync_task.done():
+            self._sync_task = asyncio.create_task(self._sync_loop())
+
+    async def _sync_loop(self) -> None:
+        while self._sync_requested:
+            await asyncio.sleep(self.SYNC_DELAY)
+            self._sync_requested = False
+            try:
+                result = await self._anki_request("sync")
+            except Exception as e:
+                result = str(e)
+            if isinstance(result, str):
+                logger.warning("Anki sync failed: %s", result)
+
+    def _store_audio_action(self, audio_b64: str, filename: str) -> Dict:
+        return {
+            "action": "storeMediaFile",
+            "params": {"filename": filename, "data": audio_b64},
+        }
+
     @tool(
         description=f"List cards in the Anki deck, showing the front and back of each card",
         parameters={
@@ -64,23 +189,28 @@ class AnkiTool(ToolSetHandler):
         }
     )
     async def list_cards(self) -> Union[str, Dict[str, Any]]:
-        note_ids = await self._anki_request("findNotes", {"query": f"deck:{self.DECK_NAME}"})
+        note_ids = await self._anki_request(
+            "findNotes", {"query": f"deck:{self.DECK_NAME}"}, cache_ttl=self.READ_CACHE_TTL
+        )
         if isinstance(note_ids, str):
             return note_ids
         if not note_ids:
             return {"status": "success", "deck": self.DECK_NAME, "cards": []}
-        notes_info = await self._anki_request("notesInfo", {"notes": note_ids})
+        notes_info = await self._anki_request(
+            "notesInfo", {"notes": note_ids}, cache_ttl=self.READ_CACHE_TTL
+        )
         if isinstance(notes_info, str):
             return notes_info
-        cards = [
-            {
+        cards = []
+        append = cards.append
+        for note in notes_info:
+            front, back = _card_fields(note["fields"])
+            append({
                 "note_id": note["noteId"],
-                "front": note["fields"]["Front"]["value"],
-                "back": note["fields"]["Back"]["value"],
+                "front": front["value"],
+                "back": back["value"],
                 "tags": note.get("tags", []),
-            }
-            for note in notes_info
-        ]
+            })
         return {"status": "success", "deck": self.DECK_NAME, "cards": cards}
 
     @tool(
@@ -89,7 +219,7 @@ class AnkiTool(ToolSetHandler):
             "The front side contains the English sentence and its audio. "
             "The back side contains the German sentence, its audio, and optional notes. "
             "Audio is generated via TTS for both sentences. "
-            "The collection is synced to AnkiWeb automatically after adding."
+            "The collection is synced to AnkiWeb automatically shortly after adding."
         ),
         parameters={
             "type": "object",
@@ -116,52 +246,135 @@ class AnkiTool(ToolSetHandler):
         german_sentence: str,
         notes: str = ""
     ) -> Union[str, Dict[str, Any]]:
-        deck_name = self.DECK_NAME
-        result = await self._anki_request("createDeck", {"deck": deck_name})
-        if isinstance(result, str):
-            return result
+        return await self._add_card(english_sentence, german_sentence, notes)
 
-        card_id = uuid.uuid4().hex[:10]
-        en_filename = f"anki_en_{card_id}.wav"
-        de_filename = f"anki_de_{card_id}.wav"
+    @tool(
+        description=(
+            "Add several English-German flashcards to Anki at once. "
+            "Each card is built like add_card (TTS audio for both sentences, optional notes). "
+            "Prefer this over repeated add_card calls when adding more than one card. "
+            "The collection is synced to AnkiWeb automatically shortly after adding."
+        ),
+        parameters={
+            "type": "object",
+            "properties": {
+                "cards": {
+                    "type": "array",
+                    "description": "Cards to add",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "english_sentence": {
+                                "type": "string",
+                                "description": "English sentence shown on the front of the card"
+                            },
+                            "german_sentence": {
+                                "type": "string",
+                                "description": "German sentence shown on the back of the card"
+                            },
+                            "notes": {
+                                "type": "string",
+                                "description": "Optional notes for the back of the card"
+                            }
+                        },
+                        "required": ["english_sentence", "german_sentence"]
+                    }
+                }
+            },
+            "required": ["cards"]
+        }
+    )
+    async def add_cards(self, cards: List[Dict[str, str]]) -> Union[str, Dict[str, Any]]:
+        if not cards:
+            return "Error: no cards given"
+        semaphore = asyncio.Semaphore(self.ADD_CARDS_CONCURRENCY)
+
+        async def add_one(card: Dict[str, str]) -> Union[str, Dict[str, Any]]:
+            async with semaphore:
+                try:
+                    return await self._add_card(
+                        card["english_sentence"],
+                        card["german_sentence"],
+                        card.get("notes", ""),
+                    )
+                except Exception as e:
+                    return f"Error adding card: {e}"
+
+        results = await asyncio.gather(*(add_one(card) for card in cards))
+        added = [r for r in results if isinstance(r, dict)]
+        if not added:
+            return f"Error: no cards were added: {'; '.join(results)}"
 
-        try:
-            en_audio = await self._generate_audio(english_sentence, language="en")
-        except Exception as e:
-            return f"Error generating English audio: {e}"
+        return {
+            "status": "success" if len(added) == len(cards) else "partial",
+            "deck": self.DECK_NAME,
+            "added": len(added),
+            "results": results,
+        }
 
-        try:
-            de_audio = await self._generate_audio(german_sentence, language="de")
-        except Exception as e:
-            return f"Error generating German audio: {e}"
+    async def _add_card(
+        self,
+        english_sentence: str,
+        german_sentence: str,
+        notes: str = ""
+    ) -> Union[str, Dict[str, Any]]:
+        deck_name = self.DECK_NAME
+        card_id = f"{self._RUN_ID}{next(self._CARD_COUNTER):04x}"
+        en_filename = f"anki_en_{card_id}.wav"
+        de_filename = f"anki_de_{card_id}.wav"
 
-        await self._store_audio(en_audio, en_filename)
-        await self._store_audio(de_audio, de_filename)
+        en_audio, de_audio = await asyncio.gather(
+            self._generate_audio(english_sentence, language="en"),
+            self._generate_audio(german_sentence, language="de"),
+            return_exceptions=True,
+        )
+        if isinstance(en_audio, BaseException):
+            return f"Error generating English audio: {en_audio}"
+        if isinstance(de_audio, BaseException):
+            return f"Error generating German audio: {de_audio}"
 
         front = f"{english_sentence}<br><br>[sound:{en_filename}]"
         back = f"{german_sentence}<br><br>[sound:{de_filename}]"
         if notes:
             back += f"<br><br><i>{notes}</i>"
 
-        note_id = await self._anki_request("addNote", {
-            "note": {
-                "deckName": deck_name,
-                "modelName": "Basic",
-                "fields": {
-                    "Front": front,
-                    "Back": back
-                },
-                "options": {
-                    "allowDuplicate": False
-                },
-                "tags": ["language", "en-de"]
-            }
-        })
+        # Deck creation (first card only), media upload and note creation in
+        # one request.
+        actions = []
+        if not self._deck_ready:
+            actions.append({"action": "createDeck", "params": {"deck": deck_name}})
+        actions += [
+            self._store_audio_action(en_audio, en_filename),
+            self._store_audio_action(de_audio, de_filename),
+            {"action": "addNote", "params": {
+                "note": {
+                    "deckName": deck_name,
+                    "modelName": "Basic",
+                    "fields": {
+                        "Front": front,
+                        "Back": back
+                    },
+                    "options": {
+                        "allowDuplicate": False
+                    },
+                    "tags": ["language", "en-de"]
+                }
+            }},
+        ]
+        note_index = len(actions) - 1
 
-        if isinstance(note_id, str):
-            return note_id
+        results = await self._anki_multi(actions)
 
-        await self._anki_request("sync")
+        if isinstance(results, str):
+            return results
+        errors = [r["error"] for r in results if r.get("error")]
+        if errors:
+            if any("deck" in e.lower() for e in errors):
+                self._deck_ready = False
+            return f"AnkiConnect error: {'; '.join(errors)}"
+        self._deck_ready = True
+        note_id = results[note_index]["result"]
+        self._schedule_sync()
 
         return {
             "status": "success",
@@ -1,6 +1,8 @@
-from typing import Dict, List
+from typing import Dict, List, Tuple, Union
+import asyncio
 import logging
 import base64
+import time
 
 from mikoshi.tools.context import ToolCallContext
 from mikoshi.tools.toolset_handler import ToolSetHandler, tool
@@ -10,6 +12,7 @@ logger = logging.getLogger(__name__)
 REPO_OWNER = "Mathis"
 NOTES_REPO = "Notes"
 DEFAULT_BRANCH = "main"
+DIR_CACHE_TTL = 30.0  # seconds
 
 
 class GiteaNotes(ToolSetHandler):
@@ -17,23 +20,26 @@ class GiteaNotes(ToolSetHandler):
 
     def __init__(self):
         super().__init__()
+        # path -> (fetched_at, entries). Cleared whenever this tool writes a note.
+        self._dir_cache: Dict[str, Tuple[float, List[Dict]]] = {}
 
     def _format_tree(self, entries: List[Dict], excluded_folders: set = None) -> List[str]:
-        if excluded_folders:
-            entries = [e for e in entries if e.get("name") not in excluded_folders]
-
-        dirs = [e for e in entries if e.get("type") == "dir"]
-        files = [e for e in entries if e.get("type") == "file"]
-        sorted_entries = dirs + files
-
-        lines = []
-        for i, entry in enumerate(sorted_entries):
-            is_last = (i == len(sorted_entries) - 1)
-            connector = "└── " if is_last else "├── "
+        # One pass: drop excluded entries and split into dirs and files
+        dirs, files = [], []
+        for entry in entries:
             name = entry.get("name", "")
-            entry_type = entry.get("type", "")
-            display_name = f"{name}/" if entry_type == "dir" else name
-            lines.append(f"{connector}{display_name}")
+            if excluded_folders and name in excluded_folders:
+                continue
+            entry_type = entry.get("type")
+            if entry_type == "dir":
+                dirs.append(f"{name}/")
+            elif entry_type == "file":
+                files.append(name)
+        dirs.extend(files)
+
+        lines = [f"├── {display_name}" for display_name in dirs]
+        if lines:
+            lines[-1] = f"└── {dirs[-1]}"
 
         return lines
 
@@ -62,16 +68,22 @@ class GiteaNotes(ToolSetHandler):
 
             excluded_set = set(excluded_folders) if excluded_folders else None
 
-            result = await self.call_other_tool(
-                "gitea__get_dir_contents",
-                {
-                    "owner": REPO_OWNER,
-                    "repo": NOTES_REPO,
-                    "path": path,
-                    "ref": DEFAULT_BRANCH
-                },
-                context
-            )
+            cached = self._dir_cache.get(path)
+            if cached and time.monotonic() - cached[0] < DIR_CACHE_TTL:
+                result = cached[1]
+            else:
+                result = await self.call_other_tool(
+                    "gitea__get_dir_contents",
+                    {
+                        "owner": REPO_OWNER,
+                        "repo": NOTES_REPO,
+                        "path": path,
+                        "ref": DEFAULT_BRANCH
+                    },
+                    context
+                )
+                if isinstance(result, list):
+                    self._dir_cache[path] = (time.monotonic(), result)
 
             if not result:
                 return f"No notes found in '{path or 'root'}'"
@@ -127,6 +139,31 @@ class GiteaNotes(ToolSetHandler):
             logger.error(f"Error getting note '{filepath}': {e}", exc_info=True)
             return f"Error getting note: {str(e)}"
 
+    @tool(
+        description=(
+            "Get the content of several notes at once. "
+            "Prefer this over repeated get_note calls when reading more than one note."
+        ),
+        parameters={
+            "type": "object",
+            "properties": {
+                "filepaths": {
+                    "type": "array",
+                    "items": {"type": "string"},
+                    "description": "Paths to the note files"
+                }
+            },
+            "required": ["filepaths"]
+        }
+    )
+    async def get_notes(self, filepaths: List[str], context: ToolCallContext = None) -> Union[str, Dict[str, str]]:
+        if not filepaths:
+            return "Error: no filepaths given"
+
+        # get_note reports failures as strings, so one bad path doesn't sink the batch
+        contents = await asyncio.gather(*(self.get_note(fp, context) for fp in filepaths))
+        return dict(zip(filepaths, contents))
+
     @tool(
         description="Create a new note with specified content",
         parameters={
@@ -163,6 +200,7 @@ class GiteaNotes(ToolSetHandler):
                 },
                 context
             )
+            self._dir_cache.clear()
 
             return f"Successfully created note: {filepath}"
 
@@ -225,6 +263,7 @@ class GiteaNotes(ToolSetHandler):
                 params,
                 context,
             )
+            self._dir_cache.clear()
 
             return f"Successfully updated note: {filepath}"
 
@@ -9,18 +9,44 @@ Required environment variables:
 - CALDAV_PASSWORD: CalDAV password
 """
 
+import asyncio
 import os
 import logging
 from typing import List, Dict, Any, Optional, Union
 from datetime import datetime, timezone
+from uuid import uuid4
 import caldav
 from caldav.elements import dav
-from icalendar import Calendar, Todo
+from caldav.lib.error import NotFoundError
+from icalendar import Calendar
 
 from mikoshi.tools.toolset_handler import ToolSetHandler, tool
 
 logger = logging.getLogger(__name__)
 
+PRODID = "-//mikoshi//tasks//EN"
+UID_SUFFIX = "@mikoshi"
+
+# RFC 5545 TEXT escaping
+_ICAL_ESCAPES = str.maketrans({"\\": "\\\\", ";": "\\;", ",": "\\,", "\n": "\\n", "\r": ""})
+
+
+def _ical_line(name: str, value: str) -> str:
+    """Build an escaped content line, folded at 75 octets (RFC 5545 3.1)"""
+    line = f"{name}:{value.translate(_ICAL_ESCAPES)}"
+    if len(line.encode()) <= 75:
+        return line
+    parts, current, size = [], "", 0
+    for char in line:
+        char_size = len(char.encode())
+        if size + char_size > 75:
+            parts.append(current)
+            current, size = " ", 1
+        current += char
+        size += char_size
+    parts.append(current)
+    return "\r\n".join(parts)
+
 
 class CalDAVTools(ToolSetHandler):
     """Tools for managing tasks via CalDAV protocol"""
@@ -59,6 +85,9 @@ class CalDAVTools(ToolSetHandler):
 
     async def cleanup(self):
         """Clean up CalDAV connection"""
+        if self._client:
+            # Release the pooled keep-alive connections
+            self._client.close()
         self._client = None
         self._principal = None
         logger.info("CalDAV connection cleaned up")
@@ -85,10 +114,10 @@ class CalDAVTools(ToolSetHandler):
             
             task_lists = []
             for calendar in calendars:
-                # Try to get the calendar name
+                # calendars() already fetched display names in its Depth:1 PROPFIND;
+                # use_cached avoids another round trip per list.
                 try:
-                    display_name = calendar.get_properties([dav.DisplayName()])
-                    name = display_name.get('{DAV:}displayname', 'Unnamed List')
+                    name = calendar.get_property(dav.DisplayName(), use_cached=True) or 'Unnamed List'
                 except Exception:
                     name = 'Unnamed List'
                 
@@ -142,13 +171,14 @@ class CalDAVTools(ToolSetHandler):
 
         try:
             calendar = caldav.Calendar(client=self._client, url=list_url)
-            todos = calendar.todos(include_completed=include_completed)
             
-            tasks = []
-            for todo in todos:
-                task_data = self._parse_todo(todo)
-                if task_data:
-                    tasks.append(task_data)
+            def fetch_tasks() -> List[Dict[str, Any]]:
+                todos = calendar.todos(include_completed=include_completed)
+                return [task for task in map(self._parse_todo, todos) if task]
+            
+            # Fetching and parsing a large list is blocking I/O plus a lot of
+            # pure-Python parsing; keep both off the event loop.
+            tasks = await asyncio.to_thread(fetch_tasks)
             
             logger.info(f"Retrieved {len(tasks)} tasks from list {list_url}")
             return tasks
@@ -214,43 +244,45 @@ class CalDAVTools(ToolSetHandler):
         try:
             calendar = caldav.Calendar(client=self._client, url=list_url)
             
-            # Create iCalendar VTODO
-            cal = Calendar()
-            todo = Todo()
+            now = datetime.now(timezone.utc)
+            uid = f"{uuid4().hex}{UID_SUFFIX}"
             
             # Required fields
-            todo.add('summary', summary)
-            todo.add('dtstamp', datetime.now(timezone.utc))
-            todo.add('uid', f"{datetime.now(timezone.utc).timestamp()}@mikoshi")
+            lines = [
+                "BEGIN:VCALENDAR",
+                "VERSION:2.0",
+                f"PRODID:{PRODID}",
+                "BEGIN:VTODO",
+                _ical_line("SUMMARY", summary),
+                f"DTSTAMP:{now:%Y%m%dT%H%M%SZ}",
+                _ical_line("UID", uid),
+            ]
             
             # Optional fields
             if description:
-                todo.add('description', description)
+                lines.append(_ical_line("DESCRIPTION", description))
             
             if priority is not None and 0 <= priority <= 9:
-                todo.add('priority', priority)
+                lines.append(f"PRIORITY:{priority}")
             
             if due_date:
                 try:
                     # Parse ISO date and set as due date
-                    from datetime import date
                     due = datetime.fromisoformat(due_date).date()
-                    todo.add('due', due)
+                    lines.append(f"DUE;VALUE=DATE:{due:%Y%m%d}")
                 except Exception as e:
                     logger.warning(f"Invalid due date format: {due_date}, ignoring. Error: {e}")
             
             # Add status
-            todo.add('status', 'NEEDS-ACTION')
-            
-            cal.add_component(todo)
+            lines += ["STATUS:NEEDS-ACTION", "END:VTODO", "END:VCALENDAR", ""]
             
             # Save to CalDAV
-            created_todo = calendar.save_todo(cal.to_ical().decode('utf-8'))
+            created_todo = calendar.save_todo("\r\n".join(lines))
             
             logger.info(f"Created task '{summary}' in list {list_url}")
             
             return {
-                "uid": str(todo.get('uid')),
+                "uid": uid,
                 "summary": summary,
                 "url": str(created_todo.url) if hasattr(created_todo, 'url') else "unknown"
             }
@@ -292,26 +324,18 @@ class CalDAVTools(ToolSetHandler):
         try:
             calendar = caldav.Calendar(client=self._client, url=list_url)
             
-            # Get all todos and find the matching one
-            todos = calendar.todos(include_completed=False)
-            target_todo = None
-            
-            for todo in todos:
-                try:
-                    ical = Calendar.from_ical(todo.data)
-                    for component in ical.walk('VTODO'):
-                        if str(component.get('uid')) == task_uid:
-                            target_todo = todo
-                            break
-                    if target_todo:
-                        break
-                except Exception as e:
-                    logger.warning(f"Error parsing todo: {e}")
-                    continue
-            
-            if not target_todo:
+            # Server-side UID lookup (calendar-query REPORT) instead of fetching
+            # and parsing every open todo in the list
+            try:
+                target_todo = calendar.get_todo_by_uid(task_uid)
+            except NotFoundError:
                 return {"status": "error", "message": f"Task with UID {task_uid} not found in list"}
             
+            # The UID lookup also matches finished todos; don't overwrite their
+            # completion time
+            if str(target_todo.icalendar_component.get('status', '')).upper() == 'COMPLETED':
+                return {"status": "error", "message": f"Task with UID {task_uid} is already completed"}
+            
             # Update the task to completed
             ical = Calendar.from_ical(target_todo.data)
             for component in ical.walk('VTODO'):
@@ -346,43 +370,44 @@ class CalDAVTools(ToolSetHandler):
             Dictionary with task information or None if parsing fails
         """
         try:
-            ical = Calendar.from_ical(todo.data)
-            
-            for component in ical.walk('VTODO'):
-                task_data = {
-                    "uid": str(component.get('uid', '')),
-                    "summary": str(component.get('summary', 'Untitled')),
-                    "status": str(component.get('status', 'NEEDS-ACTION')),
-                    "url": str(todo.url) if hasattr(todo, 'url') else None
-                }
-                
-                # Optional fields
-                if component.get('description'):
-                    task_data['description'] = str(component.get('description'))
-                
-                if component.get('priority'):
-                    task_data['priority'] = int(component.get('priority'))
-                
-                if component.get('due'):
-                    due = component.get('due')
-                    if hasattr(due, 'dt'):
-                        task_data['due'] = due.dt.isoformat()
-                    else:
-                        task_data['due'] = str(due)
-                
-                if component.get('completed'):
-                    completed = component.get('completed')
-                    if hasattr(completed, 'dt'):
-                        task_data['completed'] = completed.dt.isoformat()
-                    else:
-                        task_data['completed'] = str(completed)
-                
-                if component.get('percent-complete'):
-                    task_data['percent_complete'] = int(component.get('percent-complete'))
-                
-                return task_data
+            # caldav has usually parsed the object already (client-side filtering);
+            # reuse that instead of re-serializing todo.data and parsing it again.
+            component = todo.icalendar_component
+            if component is None or component.name != 'VTODO':
+                return None
+
+            task_data = {
+                "uid": str(component.get('uid', '')),
+                "summary": str(component.get('summary', 'Untitled')),
+                "status": str(component.get('status', 'NEEDS-ACTION')),
+                "url": str(todo.url) if hasattr(todo, 'url') else None
+            }
             
-            return None
+            # Optional fields
+            if component.get('description'):
+                task_data['description'] = str(component.get('description'))
+            
+            if component.get('priority'):
+                task_data['priority'] = int(component.get('priority'))
+            
+            if component.get('due'):
+                due = component.get('due')
+                if hasattr(due, 'dt'):
+                    task_data['due'] = due.dt.isoformat()
+                else:
+                    task_data['due'] = str(due)
+            
+            if component.get('completed'):
+                completed = component.get('completed')
+                if hasattr(completed, 'dt'):
+                    task_data['completed'] = completed.dt.isoformat()
+                else:
+                    task_data['completed'] = str(completed)
+            
+            if component.get('percent-complete'):
+                task_data['percent_complete'] = int(component.get('percent-complete'))
+            
+            return task_data
             
         except Exception as e:
             logger.error(f"Error parsing todo: {e}", exc_info=True)
@@ -11,7 +11,7 @@ import datetime
 import json
 import logging
 import os
-from typing import Optional
+from typing import Dict, Optional
 
 from mikoshi.tools.context import ToolCallContext
 from mikoshi.tools.toolset_handler import ToolSetHandler, tool
@@ -26,6 +26,11 @@ BRANCH = "main"
 class WorkoutToolset(ToolSetHandler):
     server_name = "workout"
 
+    def __init__(self):
+        super().__init__()
+        # Write-through cache of the on-disk session files, keyed by chat_id.
+        self._sessions: Dict[str, dict] = {}
+
     # --- File tools (general) -------------------------------------------
 
     @tool(
@@ -101,23 +106,29 @@ class WorkoutToolset(ToolSetHandler):
         return os.path.join(storage, f".session.{chat_id}.json")
 
     def _load_session(self, chat_id: str) -> Optional[dict]:
+        if chat_id in self._sessions:
+            return self._sessions[chat_id]
         path = self._session_path(chat_id)
         if not os.path.exists(path):
             return None
         try:
             with open(path) as f:
-                return json.load(f)
+                session = json.load(f)
         except (json.JSONDecodeError, OSError):
             logger.warning("Corrupt session file at %s; treating as no session", path)
             return None
+        self._sessions[chat_id] = session
+        return session
 
     def _save_session(self, chat_id: str, session: dict) -> None:
         path = self._session_path(chat_id)
         os.makedirs(os.path.dirname(path), exist_ok=True)
         with open(path, "w") as f:
             json.dump(session, f, indent=2)
+        self._sessions[chat_id] = session
 
     def _delete_session(self, chat_id: str) -> None:
+        self._sessions.pop(chat_id, None)
         path = self._session_path(chat_id)
         if os.path.exists(path):
             os.remove(path)
@@ -127,17 +138,13 @@ class WorkoutToolset(ToolSetHandler):
         if not sets:
             progress = "no sets logged yet"
         else:
+            # dicts keep insertion order, so exercises stay in first-logged order
+            # even when their sets are interleaved (supersets).
             groups = {}
-            order = []
             for s in sets:
-                name = s["name"]
-                if name not in groups:
-                    groups[name] = []
-                    order.append(name)
-                groups[name].append((s["weight"], s["reps"]))
+                groups.setdefault(s["name"], []).append((s["weight"], s["reps"]))
             parts = []
-            for name in order:
-                entries = groups[name]
+            for name, entries in groups.items():
                 count = len(entries)
                 sets_word = "set" if count == 1 else "sets"
                 entries_str = ", ".join(f"{w} {r}" for w, r in entries)
@@ -204,8 +211,10 @@ class WorkoutToolset(ToolSetHandler):
             count = max(1, int(sets))
         except (TypeError, ValueError):
             count = 1
-        for _ in range(count):
-            session["sets"].append({"name": name, "weight": weight, "reps": reps})
+        # Extend a copy: the loaded dict is the cached one, and it must only
+        # change once the write has succeeded (_save_session caches it).
+        new_sets = [{"name": name, "weight": weight, "reps": reps} for _ in range(count)]
+        session = {**session, "sets": session["sets"] + new_sets}
         self._save_session(context.chat_id, session)
         logger.info(
             "chat_id=%s logged %s x%d %s %s",
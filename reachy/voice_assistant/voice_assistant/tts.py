@@ -5,6 +5,8 @@ import wave
 
 import httpx
 
+WAV_HEADER_SIZE = 44
+
 
 def synthesize(
     text: str,
@@ -29,10 +31,13 @@ def synthesize(
     resp.raise_for_status()
     wav_bytes = resp.content
 
+    # The service streams WAV with placeholder (0xFFFFFFFF) sizes, so
+    # getnframes() is meaningless; derive the duration from the payload.
     with io.BytesIO(wav_bytes) as buf, wave.open(buf, "rb") as wf:
-        frames = wf.getnframes()
+        frame_size = wf.getsampwidth() * wf.getnchannels()
         rate = wf.getframerate()
-        duration = frames / rate if rate else 0.0
+    frames = (len(wav_bytes) - WAV_HEADER_SIZE) // frame_size if frame_size else 0
+    duration = frames / rate if rate else 0.0
 
     fd, path = tempfile.mkstemp(suffix=".wav", prefix="tts_")
     with os.fdopen(fd, "wb") as f: